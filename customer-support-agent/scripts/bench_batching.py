@@ -0,0 +1,67 @@
+"""
+Compare per-request `embed_query` against the micro-batching scheduler.
+
+Runs the configured embedding model in-process and, for each concurrency
+level, embeds the same set of queries from a thread pool with and without
+batching. Reports throughput and p50/p99 latency per caller.
+
+    python scripts/bench_batching.py --concurrency 1 4 16 32 --requests 512
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import config  # noqa: E402
+from src.batching import EmbeddingBatcher  # noqa: E402
+from src.rag import _get_embeddings  # noqa: E402
+
+QUESTIONS = [
+    "How do I get a refund?",
+    "How can I reset my password?",
+    "What are your support hours?",
+    "How do I cancel my subscription?",
+    "Can I change my billing address?",
+    "what about the annual plan?",
+]
+
+
+def _measure(embed, total: int, concurrency: int):
+    def one(i):
+        start = time.perf_counter()
+        embed(f"{QUESTIONS[i % len(QUESTIONS)]} #{i}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return total / elapsed, p50 * 1000, p99 * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--max-batch", type=int, default=config.EMBED_BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=config.EMBED_BATCH_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    embeddings = _get_embeddings()
+    embeddings.embed_query("warmup")
+    batcher = EmbeddingBatcher(embeddings.embed_documents, args.max_batch, args.max_wait_ms)
+
+    print(f"{'conc':>5}{'mode':>10}{'q/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for conc in args.concurrency:
+        for mode, fn in (("direct", embeddings.embed_query), ("batched", batcher.embed)):
+            rps, p50, p99 = _measure(fn, args.requests, conc)
+            print(f"{conc:>5}{mode:>10}{rps:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Compare per-worker model loading (`uvicorn --workers N`) against the
+preforking server (`python -m src.serve`).
+
+For each mode it starts the server, waits for /health, drives /chat with a
+thread pool and reports throughput plus memory of the whole process tree.
+RSS double-counts shared pages, so PSS (from /proc/<pid>/smaps_rollup) is the
+number to compare.
+
+    python scripts/bench_workers.py --workers 4 --requests 400 --concurrency 16
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUESTIONS = [
+    "How do I get a refund?",
+    "How can I reset my password?",
+    "What are your support hours?",
+    "How do I cancel my subscription?",
+    "Can I change my billing address?",
+]
+
+
+def _children(pid: int):
+    pids = [pid]
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/task/{p}/children") as f:
+                pids.extend(int(c) for c in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def _mem_kb(pid: int, field: str) -> int:
+    path = f"/proc/{pid}/smaps_rollup" if field == "Pss" else f"/proc/{pid}/status"
+    key = "Pss:" if field == "Pss" else "VmRSS:"
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(key):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _tree_memory_mb(pid: int):
+    pids = _children(pid)
+    rss = sum(_mem_kb(p, "Rss") for p in pids) / 1024
+    pss = sum(_mem_kb(p, "Pss") for p in pids) / 1024
+    return len(pids), rss, pss
+
+
+def _wait_ready(url: str, timeout: float) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server at {url} did not become ready")
+
+
+def _drive(url: str, total: int, concurrency: int):
+    def one(i):
+        start = time.perf_counter()
+        resp = requests.post(
+            f"{url}/chat", json={"message": QUESTIONS[i % len(QUESTIONS)]}, timeout=60
+        )
+        return resp.ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(lat for _, lat in results)
+    ok = sum(1 for good, _ in results if good)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return ok, total / elapsed, p50, p99
+
+
+def _run(mode: str, args) -> dict:
+    if mode == "per-worker":
+        cmd = [
+            sys.executable, "-m", "uvicorn", "src.api:app",
+            "--port", str(args.port), "--workers", str(args.workers),
+        ]
+    else:
+        cmd = [
+            sys.executable, "-m", "src.serve",
+            "--port", str(args.port), "--workers", str(args.workers),
+        ]
+    env = dict(os.environ, LLM_PROVIDER="stub")
+    proc = subprocess.Popen(cmd, cwd=ROOT_DIR, env=env, start_new_session=True)
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        _wait_ready(url, args.startup_timeout)
+        # Let every worker finish its startup hook before measuring.
+        time.sleep(2)
+        procs, rss_idle, pss_idle = _tree_memory_mb(proc.pid)
+        ok, rps, p50, p99 = _drive(url, args.requests, args.concurrency)
+        _, rss_load, pss_load = _tree_memory_mb(proc.pid)
+    finally:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=30)
+    return {
+        "mode": mode,
+        "procs": procs,
+        "rss_idle_mb": rss_idle,
+        "pss_idle_mb": pss_idle,
+        "rss_load_mb": rss_load,
+        "pss_load_mb": pss_load,
+        "ok": ok,
+        "rps": rps,
+        "p50_ms": p50 * 1000,
+        "p99_ms": p99 * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=180.0)
+    parser.add_argument("--modes", nargs="+", default=["per-worker", "preload"])
+    args = parser.parse_args()
+
+    rows = [_run(mode, args) for mode in args.modes]
+    header = (
+        f"{'mode':<12}{'procs':>6}{'RSS idle':>10}{'PSS idle':>10}"
+        f"{'RSS load':>10}{'PSS load':>10}{'ok':>6}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}"
+    )
+    print(header)
+    for r in rows:
+        print(
+            f"{r['mode']:<12}{r['procs']:>6}{r['rss_idle_mb']:>10.0f}{r['pss_idle_mb']:>10.0f}"
+            f"{r['rss_load_mb']:>10.0f}{r['pss_load_mb']:>10.0f}{r['ok']:>6}"
+            f"{r['rps']:>8.1f}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,32 @@
-import json
-import os
+import sqlite3
 import uuid
 from .utils import now_timestamp
 from .logger import log_ticket
-from . import config
+from . import tickets
 
 
-def create_ticket(session_id: str, user_message: str) -> str:
-    ticket_id = uuid.uuid4().hex[:8]
-    entry = {
-        "timestamp": now_timestamp(),
+def create_ticket(session_id: str, user_message: str, priority: str = "normal") -> str:
+    # Ids stay 8 hex chars (users type them back, see orchestrator), so retry
+    # on the rare collision with an existing ticket.
+    for attempt in range(5):
+        ticket_id = uuid.uuid4().hex[:8]
+        try:
+            ticket = tickets.create_ticket(
+                ticket_id, session_id, user_message, priority=priority, created_at=now_timestamp()
+            )
+            break
+        except sqlite3.IntegrityError:
+            if attempt == 4:
+                raise
+    # tickets.jsonl is kept as an append-only audit log.
+    log_ticket({
+        "timestamp": ticket["created_at"],
         "ticket_id": ticket_id,
         "session_id": session_id,
         "message": user_message,
-    }
-    log_ticket(entry)
+    })
     return ticket_id
 
 
 def find_ticket(ticket_id: str) -> dict | None:
-    path = config.TICKET_LOG
-    if not os.path.isfile(path):
-        return None
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    entry = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-                if entry.get("ticket_id") == ticket_id:
-                    return entry
-    except OSError:
-        return None
-    return None
+    return tickets.get_ticket(ticket_id)
@@ -0,0 +1,161 @@
+"""
+Admission control for the chat API.
+
+- `KeyedRateLimiter`: token buckets per client / per session (HTTP 429).
+- `InFlightLimiter`: caps the number of /chat requests holding a worker
+  thread; checked on the event loop so excess requests are rejected before
+  they queue for the threadpool (HTTP 503).
+- `StageLimiter`: caps concurrent work in an expensive stage (retrieval, LLM)
+  with a bounded wait queue and a deadline. When it's full, `Overloaded` is
+  raised right away instead of letting requests pile up (HTTP 503).
+
+Limits are per process. Under `src.serve` with N workers the effective global
+limits are N times the configured values.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from . import config
+
+
+class Overloaded(Exception):
+    def __init__(self, stage: str, retry_after: float):
+        super().__init__(f"{stage} is saturated")
+        self.stage = stage
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token. Returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class KeyedRateLimiter:
+    """Token bucket per key; least recently used keys are evicted past `max_keys`."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def check(self, key: str) -> float:
+        """Returns 0 if the request is allowed, else the suggested Retry-After in seconds."""
+        if not self.enabled or not key:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take()
+
+
+class InFlightLimiter:
+    def __init__(self, name: str, max_in_flight: int, retry_after: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                raise Overloaded(self.name, self.retry_after)
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+
+class StageLimiter:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._sem = threading.BoundedSemaphore(max(1, max_concurrent))
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+    @contextmanager
+    def slot(self, blocking: bool = True):
+        """
+        Hold one unit of the stage's concurrency. With `blocking=False`, raise
+        `Overloaded` at once instead of queueing when no unit is free.
+        """
+        if not self._sem.acquire(blocking=False):
+            if not blocking:
+                raise Overloaded(self.name, self.max_wait)
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    raise Overloaded(self.name, self.max_wait)
+                self._waiting += 1
+            try:
+                acquired = self._sem.acquire(timeout=self.max_wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                raise Overloaded(self.name, self.max_wait)
+        try:
+            yield
+        finally:
+            self._sem.release()
+
+
+client_limiter = KeyedRateLimiter(config.RATE_LIMIT_CLIENT_RPS, config.RATE_LIMIT_CLIENT_BURST)
+session_limiter = KeyedRateLimiter(config.RATE_LIMIT_SESSION_RPS, config.RATE_LIMIT_SESSION_BURST)
+
+retrieval_stage = StageLimiter(
+    "retrieval", config.RETRIEVAL_MAX_CONCURRENCY, config.STAGE_MAX_QUEUE, config.STAGE_MAX_WAIT_S
+)
+llm_stage = StageLimiter(
+    "llm", config.LLM_MAX_CONCURRENCY, config.STAGE_MAX_QUEUE, config.STAGE_MAX_WAIT_S
+)
+
+chat_in_flight = InFlightLimiter("chat", config.CHAT_MAX_IN_FLIGHT, config.STAGE_MAX_WAIT_S)
+
+
+def check_threadpool_budget() -> None:
+    """
+    Fail fast on limits that would let /chat occupy the whole threadpool.
+
+    Requests waiting for a thread sit in an unbounded queue where none of
+    these limits apply, so /chat must always leave threads for other routes.
+    """
+    if config.CHAT_MAX_IN_FLIGHT >= config.THREADPOOL_SIZE:
+        raise RuntimeError(
+            f"CHAT_MAX_IN_FLIGHT ({config.CHAT_MAX_IN_FLIGHT}) must be below "
+            f"THREADPOOL_SIZE ({config.THREADPOOL_SIZE})"
+        )
@@ -1,11 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+import anyio
 from pydantic import BaseModel
 from .rag import build_or_load_vectorstore
 from .utils import new_session_id
 from .orchestrator import handle_message
-from .actions import find_ticket
+from .actions import create_ticket as open_ticket, find_ticket
 from . import config
+from . import tickets
+from .admission import Overloaded, chat_in_flight, check_threadpool_budget, client_limiter, session_limiter
+from .warm_cache import warm_cache, start_refresher
+from .log_index import get_index
+import math
 import os
+import traceback
 
 app = FastAPI(title="AI-Powered Customer Support Platform")
 
@@ -15,22 +24,87 @@ class ChatRequest(BaseModel):
     message: str
 
 
+class TicketCreate(BaseModel):
+    session_id: str | None = None
+    message: str
+    priority: str = "normal"
+
+
+class TicketUpdate(BaseModel):
+    status: str | None = None
+    assignee: str | None = None
+    priority: str | None = None
+
+
+class CommentCreate(BaseModel):
+    text: str
+    author: str | None = None
+
+
 @app.on_event("startup")
 def _startup():
+    check_threadpool_budget()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = config.THREADPOOL_SIZE
+    # One-time import of tickets written before the SQLite store existed.
+    if tickets.count_tickets() == 0:
+        tickets.migrate_jsonl(config.TICKET_LOG)
+    if config.LOG_INDEX_ENABLED:
+        # Catch the search index up with the whole log here, not in a request.
+        # The index only backs admin search, so a failure must not stop the API.
+        try:
+            get_index().sync()
+        except Exception:
+            traceback.print_exc()
     build_or_load_vectorstore()
+    warm_cache.maybe_reload()
+    if config.WARM_CACHE_REFRESH_S > 0:
+        start_refresher(config.WARM_CACHE_REFRESH_S)
 
 
+@app.exception_handler(Overloaded)
+async def _overloaded(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Service is busy ({exc.stage}). Please retry shortly."},
+        headers={"Retry-After": exc.retry_after_header},
+    )
+
+
+def _too_many_requests(retry_after: float):
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests. Please slow down.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+# async so it runs on the event loop and stays responsive while the
+# threadpool is busy with /chat requests.
 @app.get("/health")
-def health():
+async def health():
     vector_exists = os.path.isdir(config.CHROMA_DIR)
     return {"status": "ok", "vector_store": vector_exists}
 
 
+# async so rate limits and the in-flight cap are enforced on the event loop,
+# before the request waits for a threadpool thread.
 @app.post("/chat")
-def chat(req: ChatRequest):
-    session_id = req.session_id or new_session_id()
-    result = handle_message(session_id, req.message)
-    return result
+async def chat(req: ChatRequest, request: Request):
+    client = request.client.host if request.client else ""
+    retry_after = client_limiter.check(client)
+    if retry_after:
+        raise _too_many_requests(retry_after)
+    if req.session_id:
+        retry_after = session_limiter.check(req.session_id)
+        if retry_after:
+            raise _too_many_requests(retry_after)
+
+    chat_in_flight.acquire()
+    try:
+        session_id = req.session_id or new_session_id()
+        return await run_in_threadpool(handle_message, session_id, req.message)
+    finally:
+        chat_in_flight.release()
 
 
 @app.get("/ticket/{ticket_id}")
@@ -39,3 +113,79 @@ def get_ticket(ticket_id: str):
     if not ticket:
         return {"found": False, "ticket": None}
     return {"found": True, "ticket": ticket}
+
+
+@app.post("/tickets")
+def create_ticket(req: TicketCreate):
+    session_id = req.session_id or new_session_id()
+    try:
+        ticket_id = open_ticket(session_id, req.message, priority=req.priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ticket = tickets.get_ticket(ticket_id)
+    return {"found": True, "ticket": ticket}
+
+
+@app.get("/tickets")
+def list_tickets(
+    session_id: str | None = None,
+    status: str | None = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+    limit: int = 20,
+    cursor: str | None = None,
+):
+    try:
+        return tickets.list_tickets(
+            session_id=session_id,
+            status=status,
+            created_from=created_from,
+            created_to=created_to,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.patch("/ticket/{ticket_id}")
+def update_ticket(ticket_id: str, req: TicketUpdate):
+    try:
+        ticket = tickets.update_ticket(
+            ticket_id, status=req.status, assignee=req.assignee, priority=req.priority
+        )
+    except tickets.InvalidTransition as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not ticket:
+        raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found.")
+    return {"found": True, "ticket": ticket}
+
+
+@app.post("/ticket/{ticket_id}/comments")
+def add_comment(ticket_id: str, req: CommentCreate):
+    comment = tickets.add_comment(ticket_id, req.text, author=req.author)
+    if not comment:
+        raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found.")
+    return {"ticket_id": ticket_id, "comment": comment}
+
+
+@app.get("/admin/warm-cache")
+def warm_cache_stats():
+    return warm_cache.stats()
+
+
+@app.get("/admin/search")
+def search_chats(q: str, session_id: str | None = None, limit: int = 20, order: str = "recent"):
+    index = get_index()
+    index.sync(max_bytes=config.LOG_INDEX_REQUEST_SYNC_BYTES)
+    results = index.search(q, session_id=session_id, limit=limit, order=order)
+    return {"query": q, "count": len(results), "results": results}
+
+
+@app.get("/admin/sessions/{session_id}")
+def session_transcript(session_id: str, limit: int | None = None):
+    index = get_index()
+    index.sync(max_bytes=config.LOG_INDEX_REQUEST_SYNC_BYTES)
+    return {"session_id": session_id, "chats": index.transcript(session_id, limit=limit)}
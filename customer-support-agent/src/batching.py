@@ -0,0 +1,113 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Callable, List, Optional
+
+
+class EmbeddingBatcher:
+    """
+    Collect queries from concurrent callers and embed them in one batch.
+
+    The first waiting query opens a window of at most `max_wait_ms`. Everything
+    that arrives before the window closes, up to `max_batch`, goes into a single
+    `embed_fn` call, and each caller gets its own vector back.
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], List[List[float]]],
+                 max_batch: int = 16, max_wait_ms: float = 3.0):
+        self._embed_fn = embed_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        # Threads don't survive fork, so start lazily in whichever process
+        # first needs an embedding (see src/serve.py).
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _reset_after_fork(self) -> None:
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _take(self, batch, timeout: Optional[float]) -> None:
+        text, fut = self._queue.get(timeout=timeout) if timeout is not None else self._queue.get()
+        # Callers that were cancelled while queued (e.g. an aborted async
+        # request) are dropped here so their result is never set.
+        if fut.set_running_or_notify_cancel():
+            batch.append((text, fut))
+
+    def _run(self) -> None:
+        # Never let an exception end this loop: every caller blocks on it.
+        while True:
+            batch = []
+            try:
+                self._run_once(batch)
+            except Exception as exc:
+                for _, fut in batch:
+                    _resolve(fut, exception=exc)
+
+    def _run_once(self, batch) -> None:
+        while not batch:
+            self._take(batch, None)
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                self._take(batch, max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                break
+
+        vectors = list(self._embed_fn([text for text, _ in batch]))
+        for i, (_, fut) in enumerate(batch):
+            if i < len(vectors):
+                _resolve(fut, result=vectors[i])
+            else:
+                _resolve(fut, exception=RuntimeError(
+                    f"embedding function returned {len(vectors)} vectors for {len(batch)} texts"
+                ))
+
+    def submit(self, text: str) -> Future:
+        self._ensure_started()
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def embed(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    async def aembed(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+
+def _resolve(fut: Future, result=None, exception: Optional[BaseException] = None) -> None:
+    try:
+        if exception is not None:
+            fut.set_exception(exception)
+        else:
+            fut.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+_batcher = None
+
+
+def get_batcher(embed_fn: Callable[[List[str]], List[List[float]]],
+                max_batch: int, max_wait_ms: float) -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher(embed_fn, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        os.register_at_fork(after_in_child=_batcher._reset_after_fork)
+    return _batcher
@@ -15,3 +15,45 @@ DOCS_DIR = os.getenv("DOCS_DIR", "data/documents")
 CHAT_LOG = os.getenv("CHAT_LOG", "data/logs/chats.jsonl")
 TICKET_LOG = os.getenv("TICKET_LOG", "data/logs/tickets.jsonl")
 TOP_K = int(os.getenv("TOP_K", "4"))
+
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "2"))
+WORKER_TORCH_THREADS = int(os.getenv("WORKER_TORCH_THREADS", "1"))
+
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "true").lower() == "true"
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "16"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "3"))
+
+TICKET_DB = os.getenv("TICKET_DB", "data/db/tickets.db")
+TICKET_DB_POOL_SIZE = int(os.getenv("TICKET_DB_POOL_SIZE", "8"))
+
+# Admission control; a rate of 0 disables that limiter.
+RATE_LIMIT_CLIENT_RPS = float(os.getenv("RATE_LIMIT_CLIENT_RPS", "5"))
+RATE_LIMIT_CLIENT_BURST = float(os.getenv("RATE_LIMIT_CLIENT_BURST", "20"))
+RATE_LIMIT_SESSION_RPS = float(os.getenv("RATE_LIMIT_SESSION_RPS", "1"))
+RATE_LIMIT_SESSION_BURST = float(os.getenv("RATE_LIMIT_SESSION_BURST", "5"))
+RETRIEVAL_MAX_CONCURRENCY = int(os.getenv("RETRIEVAL_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+STAGE_MAX_QUEUE = int(os.getenv("STAGE_MAX_QUEUE", "16"))
+STAGE_MAX_WAIT_S = float(os.getenv("STAGE_MAX_WAIT_S", "2"))
+# /chat requests allowed to hold a worker thread at once, and the size of that
+# threadpool; the difference is left for /health, /tickets and /admin routes.
+CHAT_MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", "24"))
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+DEGRADE_ON_OVERLOAD = os.getenv("DEGRADE_ON_OVERLOAD", "true").lower() == "true"
+
+WARM_CACHE_PATH = os.getenv("WARM_CACHE_PATH", "data/cache/warm_cache.npz")
+WARM_CACHE_THRESHOLD = float(os.getenv("WARM_CACHE_THRESHOLD", "0.9"))
+WARM_CACHE_REFRESH_S = float(os.getenv("WARM_CACHE_REFRESH_S", "300"))
+
+QUERY_REWRITE_MODE = os.getenv("QUERY_REWRITE_MODE", "heuristic").lower()
+QUERY_REWRITE_CACHE_SIZE = int(os.getenv("QUERY_REWRITE_CACHE_SIZE", "2048"))
+SUMMARY_MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", "800"))
+# Turns quoted verbatim in the answer prompt; older ones go through the summary.
+PROMPT_HISTORY_TURNS = int(os.getenv("PROMPT_HISTORY_TURNS", "2"))
+
+LOG_INDEX_ENABLED = os.getenv("LOG_INDEX_ENABLED", "true").lower() == "true"
+LOG_INDEX_DB = os.getenv("LOG_INDEX_DB", "data/db/log_index.db")
+# Most log bytes indexed inside a request; the full catch-up runs at startup.
+LOG_INDEX_REQUEST_SYNC_BYTES = int(os.getenv("LOG_INDEX_REQUEST_SYNC_BYTES", "262144"))
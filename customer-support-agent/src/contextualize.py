@@ -0,0 +1,116 @@
+"""
+Turn follow-up messages into standalone retrieval queries.
+
+"what about the annual plan?" retrieves poorly on its own. If a message looks
+like a follow-up, it is expanded using the recent turns, either with a cheap
+keyword heuristic or (QUERY_REWRITE_MODE=llm) with a cached LLM rewrite.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from . import config
+from .prompts import format_rewrite_prompt
+
+_FOLLOW_UP_START = re.compile(
+    r"^(what|how) about\b|^(and|also|but|or|so|then)\b|^what if\b|^same\b|^(is|does|can|will) (it|that|this)\b"
+)
+_REFERENCES = {"it", "that", "this", "those", "these", "they", "them", "one", "ones", "there", "same"}
+_STOPWORDS = {
+    "the", "and", "a", "an", "to", "of", "in", "on", "for", "is", "are", "was", "were",
+    "i", "you", "we", "it", "my", "your", "our", "me", "with", "this", "that", "have",
+    "has", "had", "do", "does", "did", "can", "could", "would", "should", "please",
+    "how", "what", "when", "where", "why", "which", "who", "about", "there", "get",
+    "its", "they", "them", "be", "if", "or", "so", "any", "some", "will",
+}
+
+_SMALL_TALK = {
+    "thanks", "thank", "thx", "ok", "okay", "cool", "great", "nice", "perfect", "bye",
+    "hi", "hello", "hey", "yes", "yeah", "yep", "no", "nope", "sure", "got",
+}
+
+_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _tokens(text: str):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def _keywords(text: str):
+    return [t for t in _tokens(text) if t not in _STOPWORDS and len(t) > 2]
+
+
+def is_follow_up(message: str) -> bool:
+    msg = message.strip().lower()
+    if _FOLLOW_UP_START.search(msg):
+        return True
+    tokens = _tokens(msg)
+    # Short messages that point back at something ("does that work on mobile?")
+    return len(tokens) <= 6 and any(t in _REFERENCES for t in tokens)
+
+
+def is_small_talk(message: str) -> bool:
+    """True for acknowledgements like "ok thanks" that carry no question of their own."""
+    tokens = _tokens(message)
+    return all(t in _SMALL_TALK or t in _STOPWORDS for t in tokens)
+
+
+def _heuristic_query(history, message: str) -> str:
+    previous = [h["text"] for h in history if h["role"] == "user"]
+    if not previous:
+        return message
+    present = set(_tokens(message))
+    carried = []
+    for word in _keywords(previous[-1]):
+        if word not in present and word not in carried:
+            carried.append(word)
+    if not carried:
+        return message
+    return f"{message} ({' '.join(carried)})"
+
+
+def _clean_rewrite(reply: Optional[str]) -> Optional[str]:
+    lines = [l.strip().strip('"').strip() for l in (reply or "").splitlines()]
+    lines = [l for l in lines if l]
+    return lines[0][:300] if lines else None
+
+
+def _llm_query(history, message: str, llm: Callable[[str], Optional[str]]) -> Optional[str]:
+    recent = history[-4:]
+    key = (tuple((h["role"], h["text"]) for h in recent), message)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    rewritten = _clean_rewrite(llm(format_rewrite_prompt(recent, message)))
+    if not rewritten:
+        # Let the caller fall back to the heuristic; don't cache a failure.
+        return None
+
+    with _cache_lock:
+        _cache[key] = rewritten
+        if len(_cache) > config.QUERY_REWRITE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rewritten
+
+
+def build_retrieval_query(history, message: str,
+                          llm: Optional[Callable[[str], Optional[str]]] = None) -> str:
+    """
+    Return the query to retrieve with for `message`.
+
+    Messages that don't look like follow-ups, or sessions with no history,
+    are returned unchanged. In llm mode the heuristic is the fallback when
+    the LLM is unavailable or saturated.
+    """
+    mode = config.QUERY_REWRITE_MODE
+    if mode == "off" or not history or not is_follow_up(message):
+        return message
+    if mode == "llm" and llm is not None:
+        rewritten = _llm_query(history, message, llm)
+        if rewritten:
+            return rewritten
+    return _heuristic_query(history, message)
@@ -0,0 +1,294 @@
+"""
+Offline retrieval evaluation.
+
+Runs a grid of retrieval configurations (embedding model, chunk size, top_k,
+search mode) against a labeled query set and reports recall@k, MRR, index
+size, build time and per-query latency for each one. Configurations run in
+parallel in a process pool, each with its own throwaway Chroma index.
+
+Labels are `{"query": ..., "expected": [{"doc": ..., "chunk_id": ...}]}` JSONL
+lines, with chunk ids from the production chunking (`--label-chunk-size`).
+Because chunk ids change with chunk size, a retrieved chunk counts as a hit
+if its text overlaps the expected chunk's text. Without `--labels`, a set is
+mined from the chat log using each answered question's top source.
+
+    python -m src.evaluate --models sentence-transformers/all-MiniLM-L6-v2 \\
+        --chunk-sizes 400 800 1200 --top-k 2 4 8 --modes similarity mmr --jobs 4
+
+Models must already be in the local Hugging Face cache; nothing is
+downloaded unless `--allow-download` is passed.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from . import config
+from .rag import chunk_text, load_documents
+
+MODES = ("similarity", "mmr")
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _paragraphs(text: str):
+    return {_norm(p) for p in text.split("\n\n") if len(p.strip()) > 20}
+
+
+def _matches(retrieved: str, expected: str) -> bool:
+    r, e = _norm(retrieved), _norm(expected)
+    if not r or not e:
+        return False
+    if r in e or e in r or r[:100] in e or e[:100] in r:
+        return True
+    return bool(_paragraphs(retrieved) & _paragraphs(expected))
+
+
+def load_labels(path: str) -> List[dict]:
+    labels = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if item.get("query") and item.get("expected"):
+                labels.append(item)
+    return labels
+
+
+def mine_labels(chat_log: str, limit: int = 500) -> List[dict]:
+    """
+    Build a weak label set from answered chats: query -> its top logged source.
+
+    Labels reflect what production retrieval returned, so they measure
+    agreement with the current setup, not ground truth. Hand-label when you can.
+    """
+    seen = set()
+    labels = []
+    if not os.path.isfile(chat_log):
+        return labels
+    with open(chat_log, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("route") not in ("rag", "cache") or not entry.get("sources"):
+                continue
+            query = entry.get("retrieval_query") or entry.get("user_message", "")
+            key = _norm(query.lower())
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            top = entry["sources"][0]
+            labels.append({"query": query, "expected": [{"doc": top.get("doc"), "chunk_id": top.get("chunk_id")}]})
+    return labels[-limit:]
+
+
+def _expected_texts(labels: List[dict], docs, label_chunk_size: int) -> List[List[str]]:
+    chunks = {name: chunk_text(text, label_chunk_size) for name, text in docs}
+    resolved = []
+    for item in labels:
+        texts = []
+        for exp in item["expected"]:
+            doc_chunks = chunks.get(exp.get("doc"), [])
+            idx = exp.get("chunk_id")
+            if isinstance(idx, int) and 0 <= idx < len(doc_chunks):
+                texts.append(doc_chunks[idx])
+        resolved.append(texts)
+    return resolved
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _init_worker(threads: int) -> None:
+    import torch
+    torch.set_num_threads(max(1, threads))
+
+
+def _release_store(store) -> None:
+    # Pool workers are reused across configs: close this config's chromadb
+    # system and its SQLite handles before the directory is deleted, as
+    # rag.close_vectorstore does.
+    try:
+        store.delete_collection()
+    except Exception:
+        pass
+    client = getattr(store, "_client", None)
+    if client is not None and hasattr(client, "clear_system_cache"):
+        client.clear_system_cache()
+
+
+def evaluate_config(cfg: dict, docs, queries: List[str], expected: List[List[str]]) -> dict:
+    from langchain_chroma import Chroma
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    k = cfg["top_k"]
+    embeddings = HuggingFaceEmbeddings(model_name=cfg["model"])
+    tmp_dir = tempfile.mkdtemp(prefix="rag-eval-")
+    store = None
+    try:
+        texts, metadatas = [], []
+        for doc_name, text in docs:
+            for idx, chunk in enumerate(chunk_text(text, cfg["chunk_size"])):
+                texts.append(chunk)
+                metadatas.append({"doc": doc_name, "chunk_id": idx})
+
+        start = time.perf_counter()
+        store = Chroma(collection_name="eval", persist_directory=tmp_dir, embedding_function=embeddings)
+        if texts:
+            store.add_texts(texts=texts, metadatas=metadatas)
+        build_s = time.perf_counter() - start
+        index_bytes = _dir_size(tmp_dir)
+
+        def search(query: str):
+            if cfg["mode"] == "mmr":
+                return store.max_marginal_relevance_search(query, k=k, fetch_k=max(20, 4 * k))
+            return [doc for doc, _ in store.similarity_search_with_score(query, k=k)]
+
+        if queries:
+            search(queries[0])  # warm-up, not timed
+
+        latencies, recalls, reciprocal_ranks = [], [], []
+        for query, exp_texts in zip(queries, expected):
+            start = time.perf_counter()
+            results = search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not exp_texts:
+                continue
+            found = [any(_matches(doc.page_content, e) for doc in results) for e in exp_texts]
+            recalls.append(sum(found) / len(exp_texts))
+            rank = next(
+                (i + 1 for i, doc in enumerate(results) if any(_matches(doc.page_content, e) for e in exp_texts)),
+                None,
+            )
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+    finally:
+        if store is not None:
+            _release_store(store)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return dict(
+        cfg,
+        chunks=len(texts),
+        queries=len(recalls),
+        recall_at_k=sum(recalls) / len(recalls) if recalls else 0.0,
+        mrr=sum(reciprocal_ranks) / len(reciprocal_ranks) if reciprocal_ranks else 0.0,
+        index_mb=index_bytes / (1024 * 1024),
+        build_s=build_s,
+        p50_ms=_percentile(latencies, 50),
+        p95_ms=_percentile(latencies, 95),
+        p99_ms=_percentile(latencies, 99),
+    )
+
+
+def _grid(args) -> List[dict]:
+    if args.grid:
+        with open(args.grid, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return [
+        {"model": m, "chunk_size": c, "top_k": k, "mode": mode}
+        for m, c, k, mode in itertools.product(args.models, args.chunk_sizes, args.top_k, args.modes)
+    ]
+
+
+def _print_table(rows: List[dict]) -> None:
+    header = (
+        f"{'model':<42}{'chunk':>6}{'k':>4}{'mode':>11}{'recall@k':>10}{'MRR':>7}"
+        f"{'chunks':>8}{'index MB':>10}{'build s':>9}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}"
+    )
+    print(header)
+    for r in rows:
+        if "error" in r:
+            print(f"{r['model'][-42:]:<42}{r['chunk_size']:>6}{r['top_k']:>4}{r['mode']:>11}  error: {r['error']}")
+            continue
+        print(
+            f"{r['model'][-42:]:<42}{r['chunk_size']:>6}{r['top_k']:>4}{r['mode']:>11}"
+            f"{r['recall_at_k']:>10.3f}{r['mrr']:>7.3f}{r['chunks']:>8}{r['index_mb']:>10.2f}"
+            f"{r['build_s']:>9.2f}{r['p50_ms']:>8.1f}{r['p95_ms']:>8.1f}{r['p99_ms']:>8.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Evaluate retrieval configurations offline")
+    parser.add_argument("--labels", help="labeled query JSONL; mined from the chat log if omitted")
+    parser.add_argument("--chat-log", default=config.CHAT_LOG)
+    parser.add_argument("--mine-limit", type=int, default=500)
+    parser.add_argument("--docs-dir", default=config.DOCS_DIR)
+    parser.add_argument("--label-chunk-size", type=int, default=800,
+                        help="chunk size the labels' chunk ids refer to")
+    parser.add_argument("--grid", help="JSON list of {model, chunk_size, top_k, mode} configs")
+    parser.add_argument("--models", nargs="+", default=[config.EMBEDDING_MODEL])
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[800])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[config.TOP_K])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=["similarity"])
+    parser.add_argument("--jobs", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--allow-download", action="store_true",
+                        help="let workers download models missing from the local cache")
+    parser.add_argument("--out", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    labels = load_labels(args.labels) if args.labels else mine_labels(args.chat_log, args.mine_limit)
+    if not labels:
+        parser.error("no labeled queries found")
+    docs = load_documents(args.docs_dir)
+    expected = _expected_texts(labels, docs, args.label_chunk_size)
+    queries = [item["query"] for item in labels]
+    grid = _grid(args)
+    print(f"Evaluating {len(grid)} configurations on {len(queries)} queries with {args.jobs} workers", flush=True)
+
+    # huggingface_hub/transformers read these at import time, and spawned
+    # workers import them while unpickling, before any initializer runs, so
+    # they have to be inherited from this process's environment.
+    if not args.allow_download:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    # Split the CPU between workers so parallel configs don't oversubscribe it.
+    threads = max(1, (os.cpu_count() or 1) // args.jobs)
+    rows = []
+    with ProcessPoolExecutor(
+        max_workers=args.jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads,),
+    ) as pool:
+        futures = [pool.submit(evaluate_config, cfg, docs, queries, expected) for cfg in grid]
+        for cfg, fut in zip(grid, futures):
+            try:
+                rows.append(fut.result())
+            except Exception as e:
+                rows.append(dict(cfg, error=str(e)))
+
+    _print_table(rows)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Search index over the chat log.
+
+`chats.jsonl` stays the source of truth. This SQLite database stores, for
+every line, its byte offset plus session/timestamp/route, and an FTS5
+full-text index of the user message and response. Transcripts and search hits
+are read back from the log by seeking to the stored offsets.
+
+The index is built incrementally: `sync()` reads only the bytes appended
+since the last sync, so it's cheap to call after every `log_chat`. Rebuild it
+from scratch with:
+
+    python -m src.log_index rebuild
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Optional
+
+from . import config
+from .utils import ensure_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS chats (
+    id         INTEGER PRIMARY KEY,
+    offset     INTEGER NOT NULL UNIQUE,
+    session_id TEXT,
+    timestamp  TEXT,
+    route      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_chats_session ON chats (session_id, id);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    first_ts   TEXT,
+    last_ts    TEXT,
+    turns      INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last ON sessions (last_ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS chat_fts USING fts5(
+    user_message, response, content='', tokenize='unicode61'
+);
+"""
+
+
+def _match_expression(query: str) -> str:
+    # Quote every term so user input can't break FTS5 query syntax; terms are ANDed.
+    terms = re.findall(r"\w+", query.lower())
+    return " ".join(f'"{t}"' for t in terms)
+
+
+def _text(value) -> str:
+    # Log lines are written by hand or by older versions too; bind only strings.
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+class LogIndex:
+    def __init__(self, db_path: str, log_path: str):
+        self.db_path = db_path
+        self.log_path = log_path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process; it must not be reused across a fork.
+        if self._conn is None or self._pid != os.getpid():
+            ensure_dir(os.path.dirname(self.db_path))
+            conn = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _meta(self, conn, key: str, default: str = "") -> str:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _reset(self, conn) -> None:
+        conn.execute("DELETE FROM chats")
+        conn.execute("DELETE FROM sessions")
+        conn.execute("INSERT INTO chat_fts(chat_fts) VALUES ('delete-all')")
+        conn.execute("DELETE FROM meta")
+
+    def sync(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Index log lines appended since the last sync. Returns the number indexed.
+
+        `max_bytes` bounds the work done per call: request handlers pass it so
+        a large backlog is caught up a slice at a time (or at startup) instead
+        of inside one user's request.
+        """
+        try:
+            st = os.stat(self.log_path)
+        except OSError:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            indexed = int(self._meta(conn, "offset", "0"))
+            if st.st_size == indexed and self._meta(conn, "inode") == str(st.st_ino):
+                return 0
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                offset = int(self._meta(conn, "offset", "0"))
+                # A rotated or truncated log invalidates every stored offset.
+                if self._meta(conn, "inode", str(st.st_ino)) != str(st.st_ino) or st.st_size < offset:
+                    self._reset(conn)
+                    offset = 0
+                count = 0
+                with open(self.log_path, "rb") as f:
+                    f.seek(offset)
+                    start = offset
+                    for raw in f:
+                        if max_bytes is not None and offset - start >= max_bytes:
+                            break
+                        if not raw.endswith(b"\n"):
+                            # Partially written line; pick it up next time.
+                            break
+                        line_offset = offset
+                        offset += len(raw)
+                        # A line that can't be indexed is skipped, never retried:
+                        # the offset has already moved past it.
+                        try:
+                            entry = json.loads(raw)
+                        except ValueError:
+                            continue
+                        if not isinstance(entry, dict):
+                            continue
+                        try:
+                            self._add(conn, line_offset, entry)
+                        except (ValueError, sqlite3.InterfaceError):
+                            # e.g. text with lone surrogates that SQLite can't store.
+                            # Only the chats row can have been written before the
+                            # failure; a per-line savepoint would triple sync time.
+                            conn.execute("DELETE FROM chats WHERE offset = ?", (line_offset,))
+                            continue
+                        count += 1
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('offset', ?)", (str(offset),))
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('inode', ?)", (str(st.st_ino),))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def _add(self, conn, offset: int, entry: dict) -> None:
+        session_id = _text(entry.get("session_id")) or None
+        ts = _text(entry.get("timestamp"))
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO chats (offset, session_id, timestamp, route) VALUES (?, ?, ?, ?)",
+            (offset, session_id, ts, _text(entry.get("route")) or None),
+        )
+        if not cur.rowcount:
+            return
+        conn.execute(
+            "INSERT INTO chat_fts (rowid, user_message, response) VALUES (?, ?, ?)",
+            (cur.lastrowid, _text(entry.get("user_message")), _text(entry.get("response"))),
+        )
+        if session_id:
+            conn.execute(
+                "INSERT INTO sessions (session_id, first_ts, last_ts, turns) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT (session_id) DO UPDATE SET "
+                "last_ts = max(last_ts, excluded.last_ts), turns = turns + 1",
+                (session_id, ts, ts),
+            )
+
+    def _read(self, offsets: List[int]) -> List[dict]:
+        entries = []
+        with open(self.log_path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                try:
+                    entries.append(json.loads(f.readline()))
+                except ValueError:
+                    continue
+        return entries
+
+    def transcript(self, session_id: str, limit: Optional[int] = None) -> List[dict]:
+        """All chats for a session in log order (the last `limit` if given)."""
+        with self._lock:
+            conn = self._connection()
+            if limit:
+                rows = conn.execute(
+                    "SELECT offset FROM (SELECT id, offset FROM chats WHERE session_id = ? "
+                    "ORDER BY id DESC LIMIT ?) ORDER BY id",
+                    (session_id, limit),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT offset FROM chats WHERE session_id = ? ORDER BY id", (session_id,)
+                ).fetchall()
+        return self._read([r[0] for r in rows])
+
+    def search(self, query: str, session_id: Optional[str] = None, limit: int = 20,
+               order: str = "recent") -> List[dict]:
+        """
+        Full-text search over user messages and responses.
+
+        `order="recent"` walks the index newest first and stops after `limit`
+        hits. `order="rank"` sorts by BM25 relevance, which has to score every
+        match and is slower for very common terms. Searches within one session
+        are always newest first.
+        """
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        if session_id:
+            # Drive from the session's (few) rows and probe FTS per row instead
+            # of walking every match in the whole log.
+            sql = (
+                "SELECT c.offset FROM chats c JOIN chat_fts ON chat_fts.rowid = c.id "
+                "WHERE c.session_id = ? AND chat_fts MATCH ? ORDER BY c.id DESC LIMIT ?"
+            )
+            params = [session_id, expression]
+        else:
+            sql = "SELECT c.offset FROM chat_fts JOIN chats c ON c.id = chat_fts.rowid WHERE chat_fts MATCH ?"
+            sql += " ORDER BY rank LIMIT ?" if order == "rank" else " ORDER BY chat_fts.rowid DESC LIMIT ?"
+            params = [expression]
+        params.append(max(1, min(limit, 500)))
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        return self._read([r[0] for r in rows])
+
+    def recent_sessions(self, limit: int = 200) -> List[dict]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT session_id, first_ts, last_ts, turns FROM sessions ORDER BY last_ts DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"session_id": r[0], "first_ts": r[1], "last_ts": r[2], "turns": r[3]}
+            for r in rows
+        ]
+
+    def rebuild(self) -> int:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            self._reset(conn)
+            conn.execute("COMMIT")
+        return self.sync()
+
+
+_index: Optional[LogIndex] = None
+
+
+def get_index() -> LogIndex:
+    global _index
+    if _index is None:
+        _index = LogIndex(config.LOG_INDEX_DB, config.CHAT_LOG)
+    return _index
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Chat log search index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sync", help="index lines appended since the last sync")
+    sub.add_parser("rebuild", help="drop the index and rebuild it from the log")
+    search = sub.add_parser("search", help="full-text search")
+    search.add_argument("query")
+    search.add_argument("--session-id")
+    search.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    index = get_index()
+    if args.command == "sync":
+        print(f"Indexed {index.sync()} new chats")
+    elif args.command == "rebuild":
+        print(f"Indexed {index.rebuild()} chats")
+    else:
+        index.sync()
+        for entry in index.search(args.query, session_id=args.session_id, limit=args.limit):
+            print(json.dumps(entry, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,13 @@ def _append_jsonl(path: str, entry: dict) -> None:
 
 def log_chat(entry: dict) -> None:
     _append_jsonl(config.CHAT_LOG, entry)
+    if config.LOG_INDEX_ENABLED:
+        from .log_index import get_index
+        try:
+            get_index().sync(max_bytes=config.LOG_INDEX_REQUEST_SYNC_BYTES)
+        except Exception:
+            # The index can always be caught up later; never fail a chat over it.
+            pass
 
 
 def log_ticket(entry: dict) -> None:
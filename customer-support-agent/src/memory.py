@@ -1,4 +1,8 @@
+import re
+from . import config
+
 _memory = {}
+_summaries = {}
 
 
 def get_history(session_id: str):
@@ -38,5 +42,62 @@ def trim_history(session_id: str, max_turns: int = 6) -> None:
     
     # If the history is longer than the limit, keep only the last 'max_turns'
     if len(turns) > max_turns:
+        # Fold the turns that fall off into the rolling summary before dropping them
+        _fold_into_summary(session_id, turns[:-max_turns])
         # Slice the list to keep the last N items
         _memory[session_id] = turns[-max_turns:]
+
+
+def get_summary(session_id: str) -> str:
+    return _summaries.get(session_id, "")
+
+
+def get_prompt_history(session_id: str, verbatim_turns: int = 2):
+    """
+    Split the session into a summary and the turns to quote verbatim.
+
+    Only the last `verbatim_turns` turns are returned as-is; older turns still
+    in history are summarized along with the ones already trimmed.
+
+    Returns:
+        A `(summary, recent_turns)` tuple.
+    """
+    turns = _memory.get(session_id, [])
+    split = max(0, len(turns) - verbatim_turns)
+    summary = get_summary(session_id)
+    if split:
+        summary = _summarize(summary, turns[:split])
+    return summary, turns[split:].copy()
+
+
+def _first_sentence(text: str, max_chars: int = 160) -> str:
+    sentence = re.split(r"(?<=[.!?])\s+", text.strip(), maxsplit=1)[0]
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars].rstrip() + "..."
+    return sentence
+
+
+def _summarize(summary: str, turns) -> str:
+    lines = [l for l in summary.split("\n") if l]
+    for turn in turns:
+        label = "User asked" if turn["role"] == "user" else "Assistant replied"
+        lines.append(f"- {label}: {_first_sentence(turn['text'])}")
+
+    # Keep the summary bounded by forgetting the oldest lines first
+    while lines and len("\n".join(lines)) > config.SUMMARY_MAX_CHARS:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def _fold_into_summary(session_id: str, dropped_turns) -> None:
+    """
+    Update the session summary with turns that were trimmed from history.
+
+    Only the dropped turns are processed, so the cost doesn't grow with the
+    length of the conversation.
+
+    Args:
+        session_id: The ID of the session.
+        dropped_turns: Turns removed from the history, oldest first.
+    """
+    _summaries[session_id] = _summarize(get_summary(session_id), dropped_turns)
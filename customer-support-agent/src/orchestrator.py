@@ -3,10 +3,13 @@ from typing import Optional
 from . import config
 from .utils import now_timestamp
 from .logger import log_chat
-from .memory import get_history, append_turn, trim_history
-from .rag import retrieve
+from .memory import get_history, get_prompt_history, append_turn, trim_history
+from .rag import embed_query, retrieve
 from .prompts import format_prompt
+from .contextualize import build_retrieval_query
 from .actions import create_ticket, find_ticket
+from .admission import Overloaded, retrieval_stage, llm_stage
+from .warm_cache import warm_cache
 
 
 def _ticket_intent(message: str) -> bool:
@@ -29,7 +32,15 @@ def _extract_ticket_id(message: str) -> Optional[str]:
     return None
 
 
-def _call_llm(prompt: str, context_chunks):
+def _provider_configured() -> bool:
+    if config.LLM_PROVIDER == "groq":
+        return bool(config.GROQ_API_KEY)
+    if config.LLM_PROVIDER == "openai":
+        return bool(config.OPENAI_API_KEY)
+    return False
+
+
+def _call_provider(prompt: str) -> Optional[str]:
     provider = config.LLM_PROVIDER
     if provider == "groq" and config.GROQ_API_KEY:
         try:
@@ -56,6 +67,13 @@ def _call_llm(prompt: str, context_chunks):
             return resp.choices[0].message.content
         except Exception:
             pass
+    return None
+
+
+def _call_llm(prompt: str, context_chunks):
+    response = _call_provider(prompt)
+    if response is not None:
+        return response
 
     # Stub fallback
     if context_chunks:
@@ -67,6 +85,27 @@ def _call_llm(prompt: str, context_chunks):
     return "(Stub) I don't have enough context. Would you like me to create a support ticket?"
 
 
+def _degraded_answer(context_chunks) -> str:
+    # Retrieval-only reply used when the LLM stage is saturated.
+    top = context_chunks[0]
+    return (
+        "We're experiencing high demand, so here is the most relevant part of our "
+        f"help documentation ({top['doc']}): {top['content'][:400]}"
+    )
+
+
+def _rewrite_with_llm(prompt: str) -> Optional[str]:
+    # Rewriting is optional: without a provider, or when the LLM stage has no
+    # free slot right now, fall back to the heuristic instead of waiting.
+    if not _provider_configured():
+        return None
+    try:
+        with llm_stage.slot(blocking=False):
+            return _call_provider(prompt)
+    except Overloaded:
+        return None
+
+
 def handle_message(session_id: str, message: str) -> dict:
     history = get_history(session_id)
     ticket_id_from_msg = _extract_ticket_id(message)
@@ -74,7 +113,8 @@ def handle_message(session_id: str, message: str) -> dict:
         ticket = find_ticket(ticket_id_from_msg)
         if ticket:
             response = (
-                f"Ticket {ticket_id_from_msg} was created at {ticket.get('timestamp', '-')}. "
+                f"Ticket {ticket_id_from_msg} was created at {ticket.get('timestamp', '-')} "
+                f"and is currently {ticket.get('status', 'open').replace('_', ' ')}. "
                 f"Original message: {ticket.get('message', '-')}"
             )
         else:
@@ -104,24 +144,44 @@ def handle_message(session_id: str, message: str) -> dict:
             "ticket_id": ticket_id_from_msg if ticket else None,
         }
 
-    context_chunks = retrieve(message, config.TOP_K)
-    has_context = len(context_chunks) > 0
     ticket_intent = _ticket_intent(message)
+    ticket_request = ticket_intent and _user_confirmed(message)
+    retrieval_query = build_retrieval_query(history, message, llm=_rewrite_with_llm)
+    cached = None
+    with retrieval_stage.slot():
+        query_vector = embed_query(retrieval_query)
+        # A confirmed ticket request needs the full flow, so never answer it from cache.
+        if not ticket_request:
+            cached = warm_cache.lookup(query_vector)
+        context_chunks = [] if cached else retrieve(retrieval_query, config.TOP_K, embedding=query_vector)
+    has_context = len(context_chunks) > 0
 
     route = "rag"
     ticket_id: Optional[str] = None
 
-    if not has_context:
+    if cached:
+        route = "cache"
+        response = cached["answer"]
+        context_chunks = cached["sources"]
+    elif not has_context:
         route = "escalate"
         response = "I don't have enough context to answer that. Would you like me to create a support ticket?"
-        if ticket_intent and _user_confirmed(message):
+        if ticket_request:
             ticket_id = create_ticket(session_id, message)
             route = "ticket"
             response = f"Ticket created. Your ticket id is {ticket_id}."
     else:
-        prompt = format_prompt(history, context_chunks, message)
-        response = _call_llm(prompt, context_chunks)
-        if ticket_intent and _user_confirmed(message):
+        summary, recent = get_prompt_history(session_id, config.PROMPT_HISTORY_TURNS)
+        prompt = format_prompt(recent, context_chunks, message, summary=summary)
+        try:
+            with llm_stage.slot():
+                response = _call_llm(prompt, context_chunks)
+        except Overloaded:
+            if not config.DEGRADE_ON_OVERLOAD:
+                raise
+            route = "rag_degraded"
+            response = _degraded_answer(context_chunks)
+        if ticket_request:
             ticket_id = create_ticket(session_id, message)
             route = "ticket"
             response = f"Ticket created. Your ticket id is {ticket_id}."
@@ -135,6 +195,7 @@ def handle_message(session_id: str, message: str) -> dict:
         "session_id": session_id,
         "route": route,
         "user_message": message,
+        "retrieval_query": retrieval_query,
         "response": response,
         "sources": [
             {"doc": c.get("doc"), "chunk_id": c.get("chunk_id"), "score": c.get("score")}
@@ -5,16 +5,36 @@ SYSTEM_PROMPT = (
 )
 
 
-def format_prompt(history, context_chunks, user_message: str) -> str:
+def format_prompt(history, context_chunks, user_message: str, summary: str = "") -> str:
     context_text = "\n\n".join(
         [f"[{c['doc']} #{c['chunk_id']}] {c['content']}" for c in context_chunks]
     )
     history_text = "\n".join([f"{h['role']}: {h['text']}" for h in history])
 
+    summary_text = f"Earlier in this conversation:\n{summary}\n\n" if summary else ""
+
     return (
         f"{SYSTEM_PROMPT}\n\n"
         f"Context:\n{context_text or 'None'}\n\n"
+        f"{summary_text}"
         f"Conversation:\n{history_text or 'None'}\n\n"
         f"User: {user_message}\n"
         f"Assistant:"
     )
+
+
+REWRITE_PROMPT = (
+    "Rewrite the user's latest message as a standalone search query for a "
+    "customer support knowledge base. Resolve references to earlier turns. "
+    "Reply with the query only."
+)
+
+
+def format_rewrite_prompt(history, user_message: str) -> str:
+    history_text = "\n".join([f"{h['role']}: {h['text']}" for h in history])
+    return (
+        f"{REWRITE_PROMPT}\n\n"
+        f"Conversation:\n{history_text or 'None'}\n\n"
+        f"Latest message: {user_message}\n"
+        f"Query:"
+    )
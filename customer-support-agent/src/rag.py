@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import List, Tuple
 from langchain_chroma import Chroma
@@ -5,8 +6,10 @@ from langchain_huggingface import HuggingFaceEmbeddings
 
 from . import config
 from .utils import ensure_dir
+from .batching import get_batcher
 
 _vectorstore = None
+_embeddings = None
 
 
 def load_documents(docs_dir: str) -> List[Tuple[str, str]]:
@@ -43,11 +46,18 @@ def chunk_text(text: str, max_chars: int = 800) -> List[str]:
 
 
 def _get_embeddings():
-    return HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL)
+    # One model per process; under the preforking server (src/serve.py) this
+    # is loaded in the parent and shared copy-on-write by every worker.
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL)
+    return _embeddings
 
 
 def build_or_load_vectorstore():
     global _vectorstore
+    if _vectorstore is not None:
+        return _vectorstore
     ensure_dir(config.CHROMA_DIR)
     embeddings = _get_embeddings()
     _vectorstore = Chroma(
@@ -69,10 +79,48 @@ def build_or_load_vectorstore():
     return _vectorstore
 
 
-def retrieve(query: str, top_k: int):
+def close_vectorstore() -> None:
+    """
+    Drop the Chroma handle but keep the embedding model loaded.
+
+    Used before forking: SQLite connections must not be shared across
+    processes, so each worker reopens the (already ingested) store itself.
+    """
+    global _vectorstore
+    if _vectorstore is None:
+        return
+    # chromadb caches one client system per persist path; clear it so the
+    # next build_or_load_vectorstore() opens a fresh SQLite connection.
+    client = getattr(_vectorstore, "_client", None)
+    if client is not None and hasattr(client, "clear_system_cache"):
+        client.clear_system_cache()
+    _vectorstore = None
+
+
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    return _get_embeddings().embed_documents(texts)
+
+
+def embed_query(query: str) -> List[float]:
+    if not config.EMBED_BATCHING:
+        return _get_embeddings().embed_query(query)
+    return get_batcher(
+        _embed_batch, config.EMBED_BATCH_MAX_SIZE, config.EMBED_BATCH_MAX_WAIT_MS
+    ).embed(query)
+
+
+async def aembed_query(query: str) -> List[float]:
+    if not config.EMBED_BATCHING:
+        return await asyncio.to_thread(_get_embeddings().embed_query, query)
+    return await get_batcher(
+        _embed_batch, config.EMBED_BATCH_MAX_SIZE, config.EMBED_BATCH_MAX_WAIT_MS
+    ).aembed(query)
+
+
+def _search(embedding: List[float], top_k: int):
     if _vectorstore is None:
         build_or_load_vectorstore()
-    results = _vectorstore.similarity_search_with_score(query, k=top_k)
+    results = _vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k=top_k)
     chunks = []
     for doc, score in results:
         chunks.append({
@@ -82,3 +130,14 @@ def retrieve(query: str, top_k: int):
             "score": float(score),
         })
     return chunks
+
+
+def retrieve(query: str, top_k: int, embedding: List[float] | None = None):
+    if embedding is None:
+        embedding = embed_query(query)
+    return _search(embedding, top_k)
+
+
+async def aretrieve(query: str, top_k: int):
+    embedding = await aembed_query(query)
+    return await asyncio.to_thread(_search, embedding, top_k)
@@ -0,0 +1,148 @@
+"""
+Preforking production server.
+
+`uvicorn --workers N` spawns fresh interpreters, so every worker imports
+torch and loads its own copy of the embedding model. This launcher loads the
+model and ingests the vector store once in the parent, then forks N workers
+that share those pages copy-on-write and serve from one listening socket.
+
+    python -m src.serve --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+# Must be set before the tokenizer is first used in the parent, otherwise the
+# Rust thread pool is inherited by forked workers and can deadlock.
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+from . import config
+from . import rag
+
+# A worker that exits sooner than this after starting counts as a crash on
+# startup; after too many in a row the server gives up instead of fork-looping.
+MIN_WORKER_UPTIME_S = 5.0
+MAX_STARTUP_FAILURES = 5
+
+
+def _preload() -> None:
+    rag.build_or_load_vectorstore()
+    # Warm up once so lazily-initialised model state lands in shared pages.
+    rag._get_embeddings().embed_query("warmup")
+    rag.close_vectorstore()
+    gc.collect()
+    # Keep the GC from touching (and therefore un-sharing) preloaded objects.
+    gc.freeze()
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, threads: int) -> None:
+    import uvicorn
+
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config("src.api:app", log_level="info"))
+    server.run(sockets=[sock])
+
+
+def _spawn(sock: socket.socket, threads: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(sock, threads)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stderr.flush()
+            os._exit(code)
+    return pid
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Preforking API server")
+    parser.add_argument("--host", default=config.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=config.WEB_WORKERS)
+    parser.add_argument(
+        "--threads", type=int, default=config.WORKER_TORCH_THREADS,
+        help="torch intra-op threads per worker (0 keeps the torch default)",
+    )
+    args = parser.parse_args(argv)
+
+    _preload()
+    sock = _bind(args.host, args.port)
+    print(f"Preloaded model; forking {args.workers} workers on {args.host}:{args.port}", flush=True)
+
+    children = {_spawn(sock, args.threads): time.monotonic() for _ in range(args.workers)}
+    stopping = False
+    startup_failures = 0
+    exit_code = 0
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+
+        if time.monotonic() - started < MIN_WORKER_UPTIME_S:
+            startup_failures += 1
+        else:
+            startup_failures = 0
+        if startup_failures >= MAX_STARTUP_FAILURES:
+            print(
+                f"Workers keep exiting right after start ({startup_failures} in a row); shutting down.",
+                file=sys.stderr, flush=True,
+            )
+            exit_code = 1
+            _stop(None, None)
+            continue
+
+        # Replace crashed workers so capacity stays at --workers, backing off
+        # exponentially while they keep failing on startup.
+        if startup_failures:
+            time.sleep(min(30.0, 0.5 * 2 ** (startup_failures - 1)))
+            if stopping:
+                continue
+        children[_spawn(sock, args.threads)] = time.monotonic()
+    sock.close()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
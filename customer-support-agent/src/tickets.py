@@ -0,0 +1,316 @@
+"""
+Ticket store backed by SQLite.
+
+Tickets used to be write-once lines in `tickets.jsonl`. They now live in an
+indexed SQLite database (WAL mode, small connection pool) so they can be
+updated and listed by session, status or date without scanning a file.
+`tickets.jsonl` is still appended to as an audit log.
+
+Import existing JSONL tickets with:
+
+    python -m src.tickets migrate [--path data/logs/tickets.jsonl]
+"""
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Optional
+
+from . import config
+from .utils import ensure_dir, now_timestamp
+
+STATUSES = ("open", "in_progress", "resolved", "closed")
+PRIORITIES = ("low", "normal", "high", "urgent")
+
+# Allowed status changes; anything else raises InvalidTransition.
+TRANSITIONS = {
+    "open": {"in_progress", "resolved", "closed"},
+    "in_progress": {"open", "resolved", "closed"},
+    "resolved": {"open", "closed"},
+    "closed": {"open"},
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_id  TEXT PRIMARY KEY,
+    session_id TEXT,
+    message    TEXT NOT NULL,
+    status     TEXT NOT NULL DEFAULT 'open',
+    priority   TEXT NOT NULL DEFAULT 'normal',
+    assignee   TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_created ON tickets (created_at, ticket_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_session ON tickets (session_id, created_at, ticket_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status, created_at, ticket_id);
+
+CREATE TABLE IF NOT EXISTS ticket_comments (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket_id  TEXT NOT NULL REFERENCES tickets (ticket_id) ON DELETE CASCADE,
+    author     TEXT,
+    text       TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_comments_ticket ON ticket_comments (ticket_id, id);
+"""
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+class _Pool:
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.pid = os.getpid()
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._sem = threading.BoundedSemaphore(max(1, size))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        self._sem.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._sem.release()
+
+
+_pool: Optional[_Pool] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> _Pool:
+    global _pool
+    # Connections must not cross a fork (src/serve.py), so each process
+    # builds its own pool.
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                ensure_dir(os.path.dirname(config.TICKET_DB))
+                pool = _Pool(config.TICKET_DB, config.TICKET_DB_POOL_SIZE)
+                with pool.connection() as conn:
+                    conn.executescript(_SCHEMA)
+                _pool = pool
+    return _pool
+
+
+@contextmanager
+def _transaction():
+    with _get_pool().connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.execute("COMMIT")
+
+
+def _row(row: sqlite3.Row) -> dict:
+    ticket = dict(row)
+    # Keep the field name older callers (and tickets.jsonl) use.
+    ticket["timestamp"] = ticket["created_at"]
+    return ticket
+
+
+def _check_priority(priority: str) -> None:
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}'. Expected one of {', '.join(PRIORITIES)}.")
+
+
+def create_ticket(ticket_id: str, session_id: str, message: str,
+                  priority: str = "normal", created_at: Optional[str] = None) -> dict:
+    _check_priority(priority)
+    ts = created_at or now_timestamp()
+    with _transaction() as conn:
+        conn.execute(
+            "INSERT INTO tickets (ticket_id, session_id, message, status, priority, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'open', ?, ?, ?)",
+            (ticket_id, session_id, message, priority, ts, ts),
+        )
+    return get_ticket(ticket_id)
+
+
+def get_ticket(ticket_id: str, with_comments: bool = True) -> dict | None:
+    with _get_pool().connection() as conn:
+        row = conn.execute("SELECT * FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+        if row is None:
+            return None
+        ticket = _row(row)
+        if with_comments:
+            ticket["comments"] = [
+                dict(c) for c in conn.execute(
+                    "SELECT id, author, text, created_at FROM ticket_comments "
+                    "WHERE ticket_id = ? ORDER BY id",
+                    (ticket_id,),
+                )
+            ]
+    return ticket
+
+
+def update_ticket(ticket_id: str, status: Optional[str] = None, assignee: Optional[str] = None,
+                  priority: Optional[str] = None) -> dict | None:
+    if priority is not None:
+        _check_priority(priority)
+    with _transaction() as conn:
+        row = conn.execute("SELECT status FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+        if row is None:
+            return None
+        fields = {}
+        if status is not None and status != row["status"]:
+            if status not in STATUSES:
+                raise ValueError(f"Unknown status '{status}'. Expected one of {', '.join(STATUSES)}.")
+            if status not in TRANSITIONS[row["status"]]:
+                raise InvalidTransition(f"Cannot move ticket from '{row['status']}' to '{status}'.")
+            fields["status"] = status
+        if assignee is not None:
+            # An empty string unassigns the ticket.
+            fields["assignee"] = assignee or None
+        if priority is not None:
+            fields["priority"] = priority
+        if fields:
+            fields["updated_at"] = now_timestamp()
+            assignments = ", ".join(f"{k} = ?" for k in fields)
+            conn.execute(
+                f"UPDATE tickets SET {assignments} WHERE ticket_id = ?",
+                (*fields.values(), ticket_id),
+            )
+    return get_ticket(ticket_id)
+
+
+def add_comment(ticket_id: str, text: str, author: Optional[str] = None) -> dict | None:
+    ts = now_timestamp()
+    with _transaction() as conn:
+        if conn.execute("SELECT 1 FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone() is None:
+            return None
+        cur = conn.execute(
+            "INSERT INTO ticket_comments (ticket_id, author, text, created_at) VALUES (?, ?, ?, ?)",
+            (ticket_id, author, text, ts),
+        )
+        conn.execute("UPDATE tickets SET updated_at = ? WHERE ticket_id = ?", (ts, ticket_id))
+    return {"id": cur.lastrowid, "author": author, "text": text, "created_at": ts}
+
+
+def _upper_bound(created_to: str) -> str:
+    # A bare date means "through the end of that day".
+    if len(created_to) == 10:
+        return (date.fromisoformat(created_to) + timedelta(days=1)).isoformat()
+    return created_to
+
+
+def list_tickets(session_id: Optional[str] = None, status: Optional[str] = None,
+                 created_from: Optional[str] = None, created_to: Optional[str] = None,
+                 limit: int = 20, cursor: Optional[str] = None) -> dict:
+    """
+    List tickets newest first.
+
+    Pagination is keyset-based: pass the returned `next_cursor` to get the
+    next page. Deep pages cost the same as the first one.
+    """
+    clauses = []
+    params = []
+    if session_id:
+        clauses.append("session_id = ?")
+        params.append(session_id)
+    if status:
+        if status not in STATUSES:
+            raise ValueError(f"Unknown status '{status}'. Expected one of {', '.join(STATUSES)}.")
+        clauses.append("status = ?")
+        params.append(status)
+    if created_from:
+        clauses.append("created_at >= ?")
+        params.append(created_from)
+    if created_to:
+        clauses.append("created_at < ?")
+        params.append(_upper_bound(created_to))
+    if cursor:
+        created_at, sep, ticket_id = cursor.partition("|")
+        if not sep or not created_at or not ticket_id:
+            raise ValueError("Invalid cursor. Pass the next_cursor value from a previous page.")
+        clauses.append("(created_at, ticket_id) < (?, ?)")
+        params.extend([created_at, ticket_id])
+
+    limit = max(1, min(limit, 200))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _get_pool().connection() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM tickets {where} ORDER BY created_at DESC, ticket_id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+    items = [_row(r) for r in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = f"{last['created_at']}|{last['ticket_id']}"
+    return {"tickets": items, "next_cursor": next_cursor}
+
+
+def count_tickets() -> int:
+    with _get_pool().connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+
+
+def migrate_jsonl(path: Optional[str] = None) -> int:
+    """Import tickets from a JSONL log. Tickets already in the store are skipped."""
+    path = path or config.TICKET_LOG
+    if not os.path.isfile(path):
+        return 0
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not entry.get("ticket_id"):
+                continue
+            ts = entry.get("timestamp") or now_timestamp()
+            rows.append((entry["ticket_id"], entry.get("session_id"), entry.get("message", ""), ts, ts))
+
+    with _transaction() as conn:
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO tickets (ticket_id, session_id, message, status, priority, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'open', 'normal', ?, ?)",
+            rows,
+        )
+        imported = conn.total_changes - before
+    return imported
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Ticket store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="import tickets from a JSONL log")
+    migrate.add_argument("--path", default=config.TICKET_LOG)
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        imported = migrate_jsonl(args.path)
+        print(f"Imported {imported} tickets from {args.path} into {config.TICKET_DB}")
+
+
+if __name__ == "__main__":
+    main()
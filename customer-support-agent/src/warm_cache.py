@@ -0,0 +1,280 @@
+"""
+Precomputed answers for the most frequent questions.
+
+Offline, `build_cache` clusters the questions in the chat log by embedding
+similarity and keeps one canonical answer (with its sources) per frequent
+cluster. The result is a small `.npz` artifact that the API loads at startup
+and checks before doing retrieval and an LLM call.
+
+    python -m src.warm_cache build [--every 3600]
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from . import config
+from .contextualize import is_follow_up, is_small_talk
+from .utils import ensure_dir, now_timestamp
+
+# Only answers produced by retrieval + LLM. Cache hits are excluded so a cached
+# answer is never fed back into the next build and frozen there.
+CACHEABLE_ROUTES = {"rag"}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower()).strip(" ?!.")
+
+
+def _read_chats(path: str) -> List[dict]:
+    if not os.path.isfile(path):
+        return []
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return items
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _cluster(vectors: np.ndarray, weights: List[int], threshold: float) -> List[List[int]]:
+    """
+    Greedy leader clustering, most frequent question first.
+
+    Each question joins the closest existing cluster whose leader is at least
+    `threshold` cosine-similar, otherwise it starts a new cluster.
+    """
+    order = sorted(range(len(weights)), key=lambda i: -weights[i])
+    leaders: List[int] = []
+    clusters: List[List[int]] = []
+    for i in order:
+        if leaders:
+            sims = vectors[leaders] @ vectors[i]
+            best = int(np.argmax(sims))
+            if sims[best] >= threshold:
+                clusters[best].append(i)
+                continue
+        leaders.append(i)
+        clusters.append([i])
+    return clusters
+
+
+def build_cache(chat_log: str, out_path: str, cluster_threshold: float = 0.85,
+                min_count: int = 3, max_entries: int = 200, regenerate: bool = False) -> int:
+    from .orchestrator import _ticket_intent, _user_confirmed
+    from .rag import _get_embeddings
+
+    questions = {}
+    for entry in _read_chats(chat_log):
+        if entry.get("route") not in CACHEABLE_ROUTES:
+            continue
+        text = entry.get("user_message", "")
+        key = _normalize(text)
+        if not key or not entry.get("response"):
+            continue
+        # Answers that depended on earlier turns would be wrong for other sessions.
+        if entry.get("retrieval_query", text) != text or is_follow_up(text) or is_small_talk(text):
+            continue
+        # The API never serves confirmed ticket requests from the cache.
+        if _ticket_intent(text) and _user_confirmed(text):
+            continue
+        q = questions.setdefault(key, {"text": text, "count": 0, "latest": entry})
+        q["count"] += 1
+        # Later log lines win, so the answer reflects the current docs/prompt.
+        if entry.get("timestamp", "") >= q["latest"].get("timestamp", ""):
+            q["latest"] = entry
+
+    if not questions:
+        return 0
+
+    keys = list(questions)
+    counts = [questions[k]["count"] for k in keys]
+    vectors = _unit(np.asarray(
+        _get_embeddings().embed_documents([questions[k]["text"] for k in keys]), dtype=np.float32
+    ))
+
+    entries = []
+    centroids = []
+    for members in _cluster(vectors, counts, cluster_threshold):
+        total = sum(counts[i] for i in members)
+        if total < min_count:
+            continue
+        leader = questions[keys[members[0]]]
+        latest = max((questions[keys[i]]["latest"] for i in members), key=lambda e: e.get("timestamp", ""))
+        answer = latest.get("response", "")
+        sources = [{"doc": s.get("doc"), "chunk_id": s.get("chunk_id")} for s in latest.get("sources", [])]
+        if regenerate:
+            answer, sources = _regenerate(leader["text"])
+        weights = np.asarray([counts[i] for i in members], dtype=np.float32)[:, None]
+        centroids.append(_unit((vectors[members] * weights).sum(axis=0)))
+        entries.append({
+            "question": leader["text"],
+            "answer": answer,
+            "sources": sources,
+            "count": total,
+            "variants": len(members),
+        })
+
+    ranked = sorted(range(len(entries)), key=lambda i: -entries[i]["count"])[:max_entries]
+    entries = [entries[i] for i in ranked]
+    if ranked:
+        embeddings = np.asarray([centroids[i] for i in ranked], dtype=np.float32)
+    else:
+        embeddings = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+    ensure_dir(os.path.dirname(out_path))
+    tmp_path = out_path + ".tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        embeddings=embeddings,
+        entries=np.asarray(json.dumps(entries, ensure_ascii=False)),
+        built_at=np.asarray(now_timestamp()),
+        model=np.asarray(config.EMBEDDING_MODEL),
+    )
+    # Atomic swap so the API never loads a half-written file.
+    os.replace(tmp_path, out_path)
+    return len(entries)
+
+
+def _regenerate(question: str):
+    from .orchestrator import _call_llm
+    from .prompts import format_prompt
+    from .rag import retrieve
+
+    chunks = retrieve(question, config.TOP_K)
+    answer = _call_llm(format_prompt([], chunks, question), chunks)
+    return answer, [{"doc": c.get("doc"), "chunk_id": c.get("chunk_id")} for c in chunks]
+
+
+class WarmCache:
+    def __init__(self, path: str, threshold: float):
+        self.path = path
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._embeddings = None
+        self._entries: List[dict] = []
+        self._entry_hits: List[int] = []
+        self.built_at = None
+
+    def maybe_reload(self) -> bool:
+        """Load the artifact if it changed on disk. Returns True if it was (re)loaded."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        with np.load(self.path, allow_pickle=False) as data:
+            if str(data["model"]) != config.EMBEDDING_MODEL:
+                # Vectors from another model aren't comparable; ignore the file.
+                self._mtime = mtime
+                return False
+            embeddings = data["embeddings"]
+            entries = json.loads(str(data["entries"]))
+            built_at = str(data["built_at"])
+        with self._lock:
+            self._embeddings = embeddings
+            self._entries = entries
+            self._entry_hits = [0] * len(entries)
+            self._mtime = mtime
+            self.built_at = built_at
+        return True
+
+    def lookup(self, query_vector) -> Optional[dict]:
+        embeddings = self._embeddings
+        if embeddings is None or len(embeddings) == 0:
+            return None
+        vec = _unit(np.asarray(query_vector, dtype=np.float32))
+        sims = embeddings @ vec
+        best = int(np.argmax(sims))
+        with self._lock:
+            if embeddings is not self._embeddings:
+                return None
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entry_hits[best] += 1
+            return dict(self._entries[best], similarity=float(sims[best]))
+
+    def stats(self) -> dict:
+        with self._lock:
+            top = sorted(
+                ({"question": e["question"], "hits": h} for e, h in zip(self._entries, self._entry_hits)),
+                key=lambda x: -x["hits"],
+            )[:20]
+            return {
+                "loaded": self._embeddings is not None,
+                "built_at": self.built_at,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "top_entries": top,
+            }
+
+
+warm_cache = WarmCache(config.WARM_CACHE_PATH, config.WARM_CACHE_THRESHOLD)
+
+
+def start_refresher(interval: float) -> None:
+    """Reload the artifact in the background whenever the build job replaces it."""
+    def _loop():
+        while True:
+            time.sleep(interval)
+            try:
+                warm_cache.maybe_reload()
+            except Exception:
+                pass
+
+    threading.Thread(target=_loop, name="warm-cache-refresh", daemon=True).start()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build the warm answer cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="cluster the chat log and write the cache artifact")
+    build.add_argument("--chat-log", default=config.CHAT_LOG)
+    build.add_argument("--out", default=config.WARM_CACHE_PATH)
+    build.add_argument("--cluster-threshold", type=float, default=0.85)
+    build.add_argument("--min-count", type=int, default=3)
+    build.add_argument("--max-entries", type=int, default=200)
+    build.add_argument("--regenerate", action="store_true",
+                       help="answer each canonical question with retrieval + LLM instead of reusing the logged answer")
+    build.add_argument("--every", type=float, default=0,
+                       help="rebuild every N seconds instead of once")
+    args = parser.parse_args(argv)
+
+    while True:
+        n = build_cache(
+            args.chat_log, args.out,
+            cluster_threshold=args.cluster_threshold,
+            min_count=args.min_count,
+            max_entries=args.max_entries,
+            regenerate=args.regenerate,
+        )
+        print(f"{now_timestamp()} wrote {n} cached answers to {args.out}", flush=True)
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
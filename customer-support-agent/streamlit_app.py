@@ -4,11 +4,13 @@ from collections import Counter, defaultdict
 from datetime import datetime, date, timedelta
 import requests
 import streamlit as st
+from src.log_index import LogIndex
 
 API_URL = os.getenv("API_URL", "http://localhost:8000")
 ROOT_DIR = os.path.dirname(__file__)
 CHAT_LOG = os.path.join(ROOT_DIR, "data", "logs", "chats.jsonl")
 TICKET_LOG = os.path.join(ROOT_DIR, "data", "logs", "tickets.jsonl")
+LOG_INDEX_DB = os.path.join(ROOT_DIR, "data", "db", "log_index.db")
 
 st.set_page_config(page_title="Support Desk", page_icon=":tools:", layout="wide")
 
@@ -108,6 +110,35 @@ def _read_jsonl(path: str, limit: int | None = None):
     return items
 
 
+def _file_version(path: str):
+    try:
+        info = os.stat(path)
+    except OSError:
+        return (0, 0)
+    return (info.st_size, info.st_mtime_ns)
+
+
+# Logs are parsed once per file version and shared across reruns (every
+# widget interaction reruns the script). Cached lists must not be mutated.
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _read_log_cached(path: str, version):
+    return _read_jsonl(path)
+
+
+def _load_log(path: str):
+    return _read_log_cached(path, _file_version(path))
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _filter_log_cached(path: str, version, start_date: date, end_date: date):
+    return _filter_by_date(_read_log_cached(path, version), start_date, end_date)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _routes_cached(path: str, version):
+    return sorted({c.get("route", "unknown") for c in _read_log_cached(path, version)})
+
+
 def _parse_ts(ts: str) -> datetime | None:
     if not ts:
         return None
@@ -161,9 +192,26 @@ def _extract_keywords(text: str):
     return tokens
 
 
+def _recent_tickets(api_url: str, limit: int = 20):
+    # Newest first from the ticket store; fall back to the JSONL log if the API is down.
+    try:
+        resp = requests.get(f"{api_url}/tickets", params={"limit": limit}, timeout=5)
+        if resp.ok:
+            return resp.json().get("tickets", [])
+    except requests.RequestException:
+        pass
+    return list(reversed(_read_jsonl(TICKET_LOG, limit=limit)))
+
+
+@st.cache_resource
+def _log_index():
+    # Same index the API maintains; sync() only reads lines appended since last time.
+    return LogIndex(LOG_INDEX_DB, CHAT_LOG)
+
+
 def _stats():
-    chats = _read_jsonl(CHAT_LOG)
-    tickets = _read_jsonl(TICKET_LOG)
+    chats = _load_log(CHAT_LOG)
+    tickets = _load_log(TICKET_LOG)
     return {
         "chat_count": len(chats),
         "ticket_count": len(tickets),
@@ -205,15 +253,15 @@ if view == "Chat":
 
     with right:
         st.subheader("Recent Tickets")
-        tickets = _read_jsonl(TICKET_LOG, limit=20)
+        tickets = _recent_tickets(api_url, limit=20)
         if not tickets:
             st.markdown("<div class='panel small'>No tickets yet.</div>", unsafe_allow_html=True)
         else:
-            for t in reversed(tickets):
+            for t in tickets:
                 st.markdown(
                     f"""
 <div class='panel'>
-  <div><strong>Ticket {t.get('ticket_id')}</strong></div>
+  <div><strong>Ticket {t.get('ticket_id')}</strong> <span class='small'>{t.get('status', 'open')}</span></div>
   <div class='small'>{t.get('timestamp', '-')} | session {t.get('session_id', '-')}</div>
   <div style='margin-top:0.5rem'>{t.get('message','')}</div>
 </div>
@@ -271,8 +319,8 @@ else:
     st.title("Support Ops Overview")
     st.caption("Operational visibility for chats, escalations, and tickets.")
 
-    chats_all = _read_jsonl(CHAT_LOG)
-    tickets_all = _read_jsonl(TICKET_LOG)
+    chat_version = _file_version(CHAT_LOG)
+    ticket_version = _file_version(TICKET_LOG)
 
     default_start, default_end = _date_range_defaults()
     with st.sidebar:
@@ -283,7 +331,7 @@ else:
         )
         route_filter = st.multiselect(
             "Route",
-            options=sorted({c.get("route", "unknown") for c in chats_all}),
+            options=_routes_cached(CHAT_LOG, chat_version),
             default=[],
         )
 
@@ -292,8 +340,8 @@ else:
     else:
         start_date, end_date = default_start, default_end
 
-    chats = _filter_by_date(chats_all, start_date, end_date)
-    tickets = _filter_by_date(tickets_all, start_date, end_date)
+    chats = _filter_log_cached(CHAT_LOG, chat_version, start_date, end_date)
+    tickets = _filter_log_cached(TICKET_LOG, ticket_version, start_date, end_date)
 
     if route_filter:
         chats = [c for c in chats if c.get("route") in route_filter]
@@ -382,13 +430,39 @@ else:
 
     st.divider()
 
+    log_index = _log_index()
+    try:
+        log_index.sync()
+    except Exception as e:
+        # Searching what is already indexed is still useful.
+        st.warning(f"Could not update the chat search index: {e}")
+
+    st.subheader("Search Chats")
+    search_query = st.text_input("Keywords", placeholder="e.g. refund annual plan")
+    if search_query:
+        hits = log_index.search(search_query, limit=50)
+        if hits:
+            st.table([
+                {
+                    "timestamp": c.get("timestamp", "-"),
+                    "session": c.get("session_id", "-"),
+                    "route": c.get("route", "-"),
+                    "message": (c.get("user_message", "")[:80] + "...") if len(c.get("user_message", "")) > 80 else c.get("user_message", ""),
+                }
+                for c in hits
+            ])
+        else:
+            st.caption("No chats match those keywords.")
+
+    st.divider()
+
     st.subheader("Session Detail")
-    session_ids = sorted({c.get("session_id") for c in chats_all if c.get("session_id")})
+    session_ids = [s["session_id"] for s in log_index.recent_sessions(limit=500)]
     selected = st.selectbox("Session ID", options=[""] + session_ids)
+    typed = st.text_input("Or enter a session ID")
+    selected = typed.strip() or selected
     if selected:
-        session_chats = [c for c in chats_all if c.get("session_id") == selected]
-        session_chats = sorted(session_chats, key=lambda c: c.get("timestamp", ""))
-        for c in session_chats:
+        for c in log_index.transcript(selected):
             st.markdown(
                 f"**{c.get('timestamp','-')}** | `{c.get('route','-')}`\n\n"
                 f"User: {c.get('user_message','')}\n\n"